@@ -0,0 +1,123 @@
+"""Per-endpoint admission control.
+
+A limiter lets at most `max_concurrent` requests run at once and parks up to
+`max_queue` more for at most `queue_timeout` seconds. Anything beyond that is
+rejected straight away, and the caller answers 429 with a Retry-After header,
+so a few expensive requests cannot pile up behind each other and starve the
+database for everyone else.
+
+AdmissionLimiter is for the threaded Flask server; AsyncAdmissionLimiter is
+the asyncio equivalent used by asgi.py. Limits are per process.
+"""
+import asyncio
+import os
+import threading
+import time
+
+
+def limits_from_env(name, max_concurrent, max_queue=2, queue_timeout=5.0, retry_after=10):
+    """Read ADMISSION_<NAME>_CONCURRENCY/_QUEUE/_QUEUE_TIMEOUT/_RETRY_AFTER, with defaults."""
+    prefix = f"ADMISSION_{name.upper()}_"
+    return {
+        'name': name,
+        'max_concurrent': int(os.getenv(prefix + 'CONCURRENCY', str(max_concurrent))),
+        'max_queue': int(os.getenv(prefix + 'QUEUE', str(max_queue))),
+        'queue_timeout': float(os.getenv(prefix + 'QUEUE_TIMEOUT', str(queue_timeout))),
+        'retry_after': int(os.getenv(prefix + 'RETRY_AFTER', str(retry_after))),
+    }
+
+
+class AdmissionLimiter:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout, retry_after):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls, name, max_concurrent, **defaults):
+        return cls(**limits_from_env(name, max_concurrent, **defaults))
+
+    def acquire(self):
+        """Return True once admitted, False when the request should get a 429."""
+        with self._cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {'active': self.active, 'waiting': self.waiting, 'rejected': self.rejected,
+                    'max_concurrent': self.max_concurrent, 'max_queue': self.max_queue}
+
+
+class AsyncAdmissionLimiter(AdmissionLimiter):
+    """Same policy for coroutines; must only be used from one event loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_cond = None
+
+    def _condition(self):
+        # Created lazily so it binds to the running loop, not the import-time one.
+        if self._async_cond is None:
+            self._async_cond = asyncio.Condition()
+        return self._async_cond
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            if self.active < self.max_concurrent:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    cond.wait_for(lambda: self.active < self.max_concurrent), self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            return True
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self.active -= 1
+            cond.notify()
+
+    def stats(self):
+        return {'active': self.active, 'waiting': self.waiting, 'rejected': self.rejected,
+                'max_concurrent': self.max_concurrent, 'max_queue': self.max_queue}
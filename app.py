@@ -1,16 +1,23 @@
 import os
+import re
 import json
 import csv
+import threading
+import time
 from datetime import datetime
+from functools import wraps
 from decimal import Decimal, InvalidOperation
 from io import StringIO
 
-from flask import Flask, request, jsonify, render_template, make_response, session, redirect, url_for, flash
+from flask import Flask, Response, request, jsonify, render_template, make_response, session, redirect, url_for, flash, stream_with_context
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import DictCursor
 from dotenv import load_dotenv
 
+from admission import AdmissionLimiter
+from search_cache import SearchCache
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -18,6 +25,55 @@ app = Flask(__name__)
 # Secret key for session management. Prefer to set via environment in production.
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
 
+# Cache for /search results. Every committed write to soc_inventory must call
+# search_cache.bump_generation() so cached pages are never stale.
+search_cache = SearchCache.from_env()
+
+# Concurrency limits for expensive endpoints, per process (see admission.py).
+export_limiter = AdmissionLimiter.from_env('export', max_concurrent=2)
+import_limiter = AdmissionLimiter.from_env('import', max_concurrent=2)
+advanced_search_limiter = AdmissionLimiter.from_env('advanced_search', max_concurrent=4, max_queue=4)
+bulk_limiter = AdmissionLimiter.from_env('bulk', max_concurrent=1, max_queue=1)
+ADMISSION_LIMITERS = [export_limiter, import_limiter, advanced_search_limiter, bulk_limiter]
+
+
+def too_many_requests(limiter):
+    """429 response with Retry-After for a request `limiter` did not admit."""
+    retry_after = str(limiter.retry_after)
+    if request.path.startswith('/api/'):
+        response = jsonify({"error": "too_many_requests",
+                            "details": f"too many concurrent {limiter.name} requests, retry later"})
+    else:
+        response = make_response(f"Too many concurrent {limiter.name} requests. "
+                                 f"Please retry in {retry_after} seconds.")
+    response.status_code = 429
+    response.headers['Retry-After'] = retry_after
+    return response
+
+
+def admission_limited(limiter):
+    """Run the view only when `limiter` admits it; otherwise answer 429.
+
+    Streamed responses keep their slot until the stream is closed.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limiter.acquire():
+                return too_many_requests(limiter)
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                limiter.release()
+                raise
+            if response.is_streamed:
+                response.call_on_close(limiter.release)
+            else:
+                limiter.release()
+            return response
+        return wrapper
+    return decorator
+
 
 def parse_date(d):
     """Parse a date from several common formats to a date object.
@@ -45,23 +101,303 @@ def parse_date(d):
     return None
 
 
-def get_db_conn():
-    db_host = os.getenv("DB_HOST", "localhost")
-    db_port = os.getenv("DB_PORT", "5432")
-    db_name = os.getenv("DB_NAME", "inventory_db")
-    db_user = os.getenv("DB_USER", "postgres")
-    db_password = os.getenv("DB_PASSWORD", "P@ssw0rd")
+def get_db_params():
+    """Connection settings shared by psycopg2 here and the async pool in asgi.py."""
+    return {
+        'host': os.getenv("DB_HOST", "localhost"),
+        'port': os.getenv("DB_PORT", "5432"),
+        'dbname': os.getenv("DB_NAME", "inventory_db"),
+        'user': os.getenv("DB_USER", "postgres"),
+        'password': os.getenv("DB_PASSWORD", "P@ssw0rd"),
+    }
 
-    conn = psycopg2.connect(
-        host=db_host,
-        port=db_port,
-        dbname=db_name,
-        user=db_user,
-        password=db_password,
-    )
+
+# statement_timeout budgets in milliseconds, per route group. Interactive pages
+# get short budgets so they stay fast while exports and imports run; override
+# with STATEMENT_TIMEOUT_<ROUTE>_MS, 0 disables the limit.
+STATEMENT_TIMEOUTS_MS = {
+    'search': 3000,
+    'dashboard': 5000,
+    'maintenance_expiry': 5000,
+    'write': 5000,
+    'advanced_search': 15000,
+    'bulk': 30000,  # per batch statement
+    'export': 120000,
+    'import': 300000,
+}
+
+
+def statement_timeout_ms(route):
+    if route is None:
+        return 0
+    return int(os.getenv(f"STATEMENT_TIMEOUT_{route.upper()}_MS", STATEMENT_TIMEOUTS_MS[route]))
+
+
+def get_db_conn(route=None):
+    """Open a connection; `route` applies that route's statement_timeout budget."""
+    params = get_db_params()
+    timeout_ms = statement_timeout_ms(route)
+    if timeout_ms:
+        params['options'] = f"-c statement_timeout={timeout_ms}"
+    conn = psycopg2.connect(**params)
     return conn
 
 
+# --- Shared SQL ---------------------------------------------------------------
+# Statements used by the Flask routes, the async routes in asgi.py and the
+# plan checks in bench/check_query_plans.py. They only use %s placeholders so
+# they run unchanged on psycopg2 and psycopg 3.
+
+UPSERT_ITEM_SQL = """
+    INSERT INTO soc_inventory (
+        record_date, label, type, brand, vendor, model_no, serial_no,
+        location, location_2, location_3, invoice_no, purchase_date, price,
+        maintenance_end_date, specification1, specification2, specification3,
+        project_code, department, status, updated_by
+    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    ON CONFLICT (serial_no) DO UPDATE SET
+        record_date = EXCLUDED.record_date,
+        label = EXCLUDED.label,
+        type = EXCLUDED.type,
+        brand = EXCLUDED.brand,
+        vendor = EXCLUDED.vendor,
+        model_no = EXCLUDED.model_no,
+        location = EXCLUDED.location,
+        location_2 = EXCLUDED.location_2,
+        location_3 = EXCLUDED.location_3,
+        invoice_no = EXCLUDED.invoice_no,
+        purchase_date = EXCLUDED.purchase_date,
+        price = EXCLUDED.price,
+        maintenance_end_date = EXCLUDED.maintenance_end_date,
+        specification1 = EXCLUDED.specification1,
+        specification2 = EXCLUDED.specification2,
+        specification3 = EXCLUDED.specification3,
+        project_code = EXCLUDED.project_code,
+        department = EXCLUDED.department,
+        status = EXCLUDED.status,
+        updated_by = EXCLUDED.updated_by
+"""
+
+INSERT_ITEM_NO_SERIAL_SQL = """
+    INSERT INTO soc_inventory (
+        record_date, label, type, brand, vendor, model_no, location,
+        location_2, location_3, invoice_no, purchase_date, price,
+        maintenance_end_date, specification1, specification2, specification3,
+        project_code, department, status, updated_by
+    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+"""
+
+UPDATE_ITEM_SQL = """
+    UPDATE soc_inventory SET
+        record_date = %s,
+        label = %s,
+        type = %s,
+        brand = %s,
+        vendor = %s,
+        model_no = %s,
+        serial_no = %s,
+        location = %s,
+        location_2 = %s,
+        location_3 = %s,
+        invoice_no = %s,
+        purchase_date = %s,
+        price = %s,
+        maintenance_end_date = %s,
+        specification1 = %s,
+        specification2 = %s,
+        specification3 = %s,
+        project_code = %s,
+        department = %s,
+        status = %s,
+        updated_by = %s
+    WHERE serial_no = %s
+    RETURNING serial_no
+"""
+
+# Quick search matches a prefix against 12 columns; pass [pattern] * 12.
+QUICK_SEARCH_WHERE = """
+    label ILIKE %s OR type ILIKE %s OR brand ILIKE %s OR vendor ILIKE %s
+      OR model_no ILIKE %s OR serial_no ILIKE %s OR location ILIKE %s
+      OR location_2 ILIKE %s OR invoice_no ILIKE %s OR status ILIKE %s
+      OR project_code ILIKE %s OR department ILIKE %s
+"""
+
+# Search pages take the ORDER BY clause through sql.SQL(...).format().
+SEARCH_ALL_PAGE_SQL = "SELECT * FROM soc_inventory ORDER BY {} NULLS LAST LIMIT %s OFFSET %s"
+SEARCH_COUNT_SQL = "SELECT COUNT(*) FROM soc_inventory WHERE " + QUICK_SEARCH_WHERE
+SEARCH_PAGE_SQL = (
+    "SELECT * FROM soc_inventory WHERE " + QUICK_SEARCH_WHERE
+    + " ORDER BY {} NULLS LAST LIMIT %s OFFSET %s"
+)
+
+DASHBOARD_TYPE_COUNTS_SQL = """
+    SELECT type, COUNT(*) as count
+    FROM soc_inventory
+    WHERE type IS NOT NULL AND type != ''
+    GROUP BY type
+    ORDER BY count DESC, type
+"""
+DASHBOARD_TOTAL_SQL = "SELECT COUNT(*) as total FROM soc_inventory"
+DASHBOARD_RECENT_SQL = """
+    SELECT serial_no, label, type, brand, updated_at
+    FROM soc_inventory
+    ORDER BY updated_at DESC
+    LIMIT 10
+"""
+
+# Maintenance expiry report. Both statements are range scans on the partial
+# index from migrations/add_maintenance_end_date_index.sql.
+MAINTENANCE_WINDOWS = [30, 60, 90]
+MAINTENANCE_SUMMARY_SQL = """
+    SELECT window_days, vendor, department, project_code,
+           GROUPING(vendor) AS by_vendor, GROUPING(department) AS by_department,
+           GROUPING(project_code) AS by_project_code, COUNT(*) AS count
+    FROM (
+        SELECT CASE
+                   WHEN maintenance_end_date <= CURRENT_DATE + 30 THEN 30
+                   WHEN maintenance_end_date <= CURRENT_DATE + 60 THEN 60
+                   ELSE 90
+               END AS window_days,
+               vendor, department, project_code
+        FROM soc_inventory
+        WHERE maintenance_end_date >= CURRENT_DATE
+          AND maintenance_end_date <= CURRENT_DATE + 90
+    ) expiring
+    GROUP BY GROUPING SETS (
+        (window_days, vendor), (window_days, department), (window_days, project_code)
+    )
+"""
+MAINTENANCE_ITEMS_SQL = """
+    SELECT serial_no, label, type, brand, vendor, department, project_code,
+           location, status, maintenance_end_date
+    FROM soc_inventory
+    WHERE maintenance_end_date >= CURRENT_DATE
+      AND maintenance_end_date <= CURRENT_DATE + %s
+    ORDER BY maintenance_end_date, vendor, serial_no
+    LIMIT %s
+"""
+
+EXPORT_ALL_SQL = "SELECT * FROM soc_inventory ORDER BY updated_at DESC, label, type"
+EXPORT_SEARCH_SQL = (
+    "SELECT * FROM soc_inventory WHERE " + QUICK_SEARCH_WHERE
+    + " ORDER BY updated_at DESC, label, type"
+)
+EXPORT_DEFAULT_SQL = "SELECT * FROM soc_inventory ORDER BY updated_at DESC, label, type, brand"
+
+
+# Advanced search filters, in the order they appear on the form. Date and
+# price filters are ranges; every other field is a case-insensitive prefix.
+# facet_<column> params are exact matches, set by the facet drill-down links.
+ADVANCED_SEARCH_TEXT_FIELDS = [
+    'label', 'type', 'brand', 'vendor', 'model_no', 'serial_no', 'location', 'location_2',
+    'location_3', 'invoice_no', 'specification1', 'specification2', 'specification3',
+    'project_code', 'department', 'status',
+]
+ADVANCED_SEARCH_RANGE_FILTERS = [
+    # (start param, end param, column)
+    ('record_date_start', 'record_date_end', 'record_date'),
+    ('purchase_date_start', 'purchase_date_end', 'purchase_date'),
+    ('maintenance_date_start', 'maintenance_date_end', 'maintenance_end_date'),
+    ('price_min', 'price_max', 'price'),
+]
+# Facet counts shown next to advanced search results.
+ADVANCED_SEARCH_FACETS = ['type', 'brand', 'vendor', 'status', 'department']
+ADVANCED_SEARCH_FACET_PARAMS = ['facet_' + column for column in ADVANCED_SEARCH_FACETS]
+FACET_VALUES_LIMIT = 20
+ADVANCED_SEARCH_PARAMS = [
+    p for start, end, _ in ADVANCED_SEARCH_RANGE_FILTERS for p in (start, end)
+] + ADVANCED_SEARCH_TEXT_FIELDS + ADVANCED_SEARCH_FACET_PARAMS
+
+
+def advanced_search_conditions(params):
+    """Build the WHERE conditions for advanced-search style filters.
+
+    params maps names from ADVANCED_SEARCH_PARAMS to strings; empty or missing
+    values are ignored. Returns (conditions, query_params) to be joined with
+    AND. Raises decimal.InvalidOperation when a price bound is not a number.
+    """
+    conditions = []
+    query_params = []
+
+    for start, end, column in ADVANCED_SEARCH_RANGE_FILTERS:
+        convert = Decimal if column == 'price' else str
+        if params.get(start):
+            conditions.append(f"{column} >= %s")
+            query_params.append(convert(params[start]))
+        if params.get(end):
+            conditions.append(f"{column} <= %s")
+            query_params.append(convert(params[end]))
+
+    for field in ADVANCED_SEARCH_TEXT_FIELDS:
+        if params.get(field):
+            conditions.append(f"{field} ILIKE %s")
+            query_params.append(f"{params[field]}%")
+
+    # Exact matches, so a drill-down returns exactly the rows its facet counted.
+    for column, param in zip(ADVANCED_SEARCH_FACETS, ADVANCED_SEARCH_FACET_PARAMS):
+        if params.get(param):
+            conditions.append(f"{column} = %s")
+            query_params.append(params[param])
+
+    return conditions, query_params
+
+
+def facets_statement(where):
+    """Counts per value of every facet column, plus the total, in one scan."""
+    columns = [sql.Identifier(c) for c in ADVANCED_SEARCH_FACETS]
+    return sql.SQL("""
+        SELECT {columns}, {groupings}, COUNT(*) AS count
+        FROM soc_inventory
+        {where}
+        GROUP BY GROUPING SETS ({sets}, ())
+    """).format(
+        columns=sql.SQL(", ").join(columns),
+        groupings=sql.SQL(", ").join(
+            sql.SQL("GROUPING({}) AS {}").format(c, sql.Identifier('g_' + name))
+            for c, name in zip(columns, ADVANCED_SEARCH_FACETS)
+        ),
+        where=sql.SQL("WHERE " + where if where else ""),
+        sets=sql.SQL(", ").join(sql.SQL("({})").format(c) for c in columns),
+    )
+
+
+def load_facets(cur, conditions, query_params):
+    """Return {'total': n, 'facets': {column: [{'value', 'count'}, ...]}}.
+
+    Each facet keeps its FACET_VALUES_LIMIT most common values.
+    """
+    cur.execute(facets_statement(" AND ".join(conditions)), query_params)
+    total = 0
+    facets = {column: [] for column in ADVANCED_SEARCH_FACETS}
+    for row in cur.fetchall():
+        grouped = [c for c in ADVANCED_SEARCH_FACETS if row['g_' + c] == 0]
+        if not grouped:
+            # The () grouping set: every matching row.
+            total = row['count']
+            continue
+        column = grouped[0]
+        facets[column].append({'value': row[column], 'count': row['count']})
+    for column, values in facets.items():
+        values.sort(key=lambda v: (-v['count'], v['value'] or ''))
+        del values[FACET_VALUES_LIMIT:]
+    return {'total': total, 'facets': facets}
+
+
+def get_facets(cur, params, conditions, query_params):
+    """load_facets() through the search cache, keyed on the normalized filters."""
+    # Prefix filters are case-insensitive, facet_<column> matches are not.
+    cache_key = search_cache.make_key(
+        'facets', sorted((k, v if k in ADVANCED_SEARCH_FACET_PARAMS else v.lower())
+                         for k, v in params.items() if v)
+    )
+    facets = search_cache.get(cache_key)
+    if facets is None:
+        generation = search_cache.generation()
+        facets = load_facets(cur, conditions, query_params)
+        search_cache.set(cache_key, facets, generation)
+    return facets
+
+
 # --- Authentication routes -------------------------------------------------
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -121,30 +457,19 @@ def login():
 def dashboard():
     """Dashboard showing inventory statistics by type"""
     try:
-        conn = get_db_conn()
+        conn = get_db_conn('dashboard')
         cur = conn.cursor(cursor_factory=DictCursor)
         
         # Get count by type
-        cur.execute("""
-            SELECT type, COUNT(*) as count
-            FROM soc_inventory
-            WHERE type IS NOT NULL AND type != ''
-            GROUP BY type
-            ORDER BY count DESC, type
-        """)
+        cur.execute(DASHBOARD_TYPE_COUNTS_SQL)
         type_stats = [dict(row) for row in cur.fetchall()]
         
         # Get total count
-        cur.execute("SELECT COUNT(*) as total FROM soc_inventory")
+        cur.execute(DASHBOARD_TOTAL_SQL)
         total_count = cur.fetchone()['total']
         
         # Get recent updates
-        cur.execute("""
-            SELECT serial_no, label, type, brand, updated_at
-            FROM soc_inventory
-            ORDER BY updated_at DESC
-            LIMIT 10
-        """)
+        cur.execute(DASHBOARD_RECENT_SQL)
         recent_items = [dict(row) for row in cur.fetchall()]
         
         cur.close()
@@ -163,6 +488,140 @@ def dashboard():
                              error=str(e))
 
 
+# --- Maintenance expiry report ---------------------------------------------
+# The summary is cached per process and refreshed in the background once it is
+# older than MAINTENANCE_SUMMARY_TTL seconds, so readers never wait on the query
+# except on a cold start, when concurrent requests wait for a single first load.
+MAINTENANCE_SUMMARY_TTL = int(os.getenv('MAINTENANCE_SUMMARY_TTL', '300'))
+MAINTENANCE_ITEMS_LIMIT = 1000
+
+_maintenance_summary = {'data': None, 'refreshed_at': 0.0, 'refreshing': False}
+_maintenance_summary_lock = threading.Lock()
+_maintenance_first_load_lock = threading.Lock()
+
+
+def load_maintenance_summary():
+    """Query expiring maintenance grouped by vendor, department and project_code.
+
+    Counts are cumulative: the 60 day window includes the 30 day one.
+    """
+    conn = get_db_conn('maintenance_expiry')
+    cur = conn.cursor(cursor_factory=DictCursor)
+    cur.execute(MAINTENANCE_SUMMARY_SQL)
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    groups = {'vendor': {}, 'department': {}, 'project_code': {}}
+    totals = dict.fromkeys(MAINTENANCE_WINDOWS, 0)
+    for row in rows:
+        # GROUPING(col) is 0 for the column the row is grouped by.
+        column = next(c for c in groups if row['by_' + c] == 0)
+        counts = groups[column].setdefault(row[column] or 'Unknown', dict.fromkeys(MAINTENANCE_WINDOWS, 0))
+        for window in MAINTENANCE_WINDOWS:
+            if row['window_days'] <= window:
+                counts[window] += row['count']
+                if column == 'vendor':
+                    totals[window] += row['count']
+
+    return {
+        'windows': MAINTENANCE_WINDOWS,
+        'totals': totals,
+        'groups': {
+            column: sorted(
+                ({'name': name, 'counts': counts} for name, counts in values.items()),
+                key=lambda g: (-g['counts'][MAINTENANCE_WINDOWS[-1]], g['name']),
+            )
+            for column, values in groups.items()
+        },
+        'refreshed_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def _refresh_maintenance_summary():
+    try:
+        data = load_maintenance_summary()
+        with _maintenance_summary_lock:
+            _maintenance_summary['data'] = data
+            _maintenance_summary['refreshed_at'] = time.monotonic()
+    except Exception as e:
+        print("Error refreshing maintenance summary:", e)
+    finally:
+        with _maintenance_summary_lock:
+            _maintenance_summary['refreshing'] = False
+
+
+def get_maintenance_summary():
+    """Return the cached summary, refreshing it when stale (stale-while-revalidate)."""
+    with _maintenance_summary_lock:
+        data = _maintenance_summary['data']
+        fresh = time.monotonic() - _maintenance_summary['refreshed_at'] < MAINTENANCE_SUMMARY_TTL
+        if data is not None and (fresh or _maintenance_summary['refreshing']):
+            return data
+        if data is not None:
+            _maintenance_summary['refreshing'] = True
+
+    if data is None:
+        with _maintenance_first_load_lock:
+            # Whoever got the lock first has loaded it while we waited.
+            data = _maintenance_summary['data']
+            if data is None:
+                _refresh_maintenance_summary()
+                data = _maintenance_summary['data']
+        if data is None:
+            raise RuntimeError('maintenance summary is unavailable')
+        return data
+
+    threading.Thread(target=_refresh_maintenance_summary, daemon=True).start()
+    return data
+
+
+def get_expiring_items(days):
+    conn = get_db_conn('maintenance_expiry')
+    cur = conn.cursor(cursor_factory=DictCursor)
+    cur.execute(MAINTENANCE_ITEMS_SQL, (days, MAINTENANCE_ITEMS_LIMIT))
+    items = [dict(row) for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return items
+
+
+@app.route('/maintenance-expiry')
+def maintenance_expiry():
+    """Items whose maintenance ends in the next 30/60/90 days."""
+    days = request.args.get('days', 30, type=int)
+    if days not in MAINTENANCE_WINDOWS:
+        days = 30
+    try:
+        summary = get_maintenance_summary()
+        items = get_expiring_items(days)
+        return render_template('maintenance_expiry.html', summary=summary, items=items,
+                               days=days, items_limit=MAINTENANCE_ITEMS_LIMIT)
+    except Exception as e:
+        print("Error loading maintenance expiry report:", e)
+        return render_template('maintenance_expiry.html', summary=None, items=[],
+                               days=days, items_limit=MAINTENANCE_ITEMS_LIMIT, error=str(e))
+
+
+@app.route('/api/items/maintenance-expiry')
+def maintenance_expiry_api():
+    """JSON version of the summary. Pass ?days=30|60|90 to include the items too."""
+    try:
+        result = dict(get_maintenance_summary())
+        days = request.args.get('days', type=int)
+        if days is not None:
+            if days not in MAINTENANCE_WINDOWS:
+                return jsonify({"error": f"'days' must be one of {MAINTENANCE_WINDOWS}"}), 400
+            result['items'] = [
+                {**item, 'maintenance_end_date': item['maintenance_end_date'].isoformat()}
+                for item in get_expiring_items(days)
+            ]
+        return jsonify(result), 200
+    except Exception as e:
+        print("Error loading maintenance expiry report:", e)
+        return jsonify({"error": "internal_server_error", "details": str(e)}), 500
+
+
 @app.route('/logout')
 def logout():
     session.pop('user_id', None)
@@ -259,77 +718,24 @@ def bulk_import():
 
 @app.route("/advanced-search")
 def advanced_search():
-    params = {
-        'record_date_start': request.args.get('record_date_start', '').strip(),
-        'record_date_end': request.args.get('record_date_end', '').strip(),
-        'purchase_date_start': request.args.get('purchase_date_start', '').strip(),
-        'purchase_date_end': request.args.get('purchase_date_end', '').strip(),
-        'maintenance_date_start': request.args.get('maintenance_date_start', '').strip(),
-        'maintenance_date_end': request.args.get('maintenance_date_end', '').strip(),
-        'price_min': request.args.get('price_min', '').strip(),
-        'price_max': request.args.get('price_max', '').strip(),
-        'label': request.args.get('label', '').strip(),
-        'type': request.args.get('type', '').strip(),
-        'brand': request.args.get('brand', '').strip(),
-        'vendor': request.args.get('vendor', '').strip(),
-        'model_no': request.args.get('model_no', '').strip(),
-        'serial_no': request.args.get('serial_no', '').strip(),
-        'location': request.args.get('location', '').strip(),
-        'location_2': request.args.get('location_2', '').strip(),
-        'location_3': request.args.get('location_3', '').strip(),
-        'invoice_no': request.args.get('invoice_no', '').strip(),
-        'specification1': request.args.get('specification1', '').strip(),
-        'specification2': request.args.get('specification2', '').strip(),
-        'specification3': request.args.get('specification3', '').strip(),
-        'project_code': request.args.get('project_code', '').strip(),
-        'department': request.args.get('department', '').strip(),
-        'status': request.args.get('status', '').strip(),
-    }
+    params = {key: request.args.get(key, '').strip() for key in ADVANCED_SEARCH_PARAMS}
+    # Facet values come from the database and must match exactly, spaces included.
+    params.update({key: request.args.get(key, '') for key in ADVANCED_SEARCH_FACET_PARAMS})
+    want_facets = request.args.get('facets') == '1'
 
     search_performed = any(v for v in params.values() if v and v.strip())
     items = []
+    facets = None
 
+    # Only searches take an admission slot; opening the empty form runs no query.
     if search_performed:
+        if not advanced_search_limiter.acquire():
+            return too_many_requests(advanced_search_limiter)
         try:
-            conn = get_db_conn()
+            conn = get_db_conn('advanced_search')
             cur = conn.cursor(cursor_factory=DictCursor)
 
-            conditions = []
-            query_params = []
-
-            if params['record_date_start']:
-                conditions.append("record_date >= %s")
-                query_params.append(params['record_date_start'])
-            if params['record_date_end']:
-                conditions.append("record_date <= %s")
-                query_params.append(params['record_date_end'])
-
-            if params['purchase_date_start']:
-                conditions.append("purchase_date >= %s")
-                query_params.append(params['purchase_date_start'])
-            if params['purchase_date_end']:
-                conditions.append("purchase_date <= %s")
-                query_params.append(params['purchase_date_end'])
-
-            if params['maintenance_date_start']:
-                conditions.append("maintenance_end_date >= %s")
-                query_params.append(params['maintenance_date_start'])
-            if params['maintenance_date_end']:
-                conditions.append("maintenance_end_date <= %s")
-                query_params.append(params['maintenance_date_end'])
-
-            if params['price_min']:
-                conditions.append("price >= %s")
-                query_params.append(Decimal(params['price_min']))
-            if params['price_max']:
-                conditions.append("price <= %s")
-                query_params.append(Decimal(params['price_max']))
-
-            text_fields = ['label', 'type', 'brand', 'vendor', 'model_no', 'serial_no', 'location', 'location_2', 'location_3', 'invoice_no', 'specification1', 'specification2', 'specification3', 'project_code', 'department', 'status']
-            for field in text_fields:
-                if params[field]:
-                    conditions.append(f"{field} ILIKE %s")
-                    query_params.append(f"{params[field]}%")
+            conditions, query_params = advanced_search_conditions(params)
 
             query = "SELECT * FROM soc_inventory"
             if conditions:
@@ -339,17 +745,39 @@ def advanced_search():
             cur.execute(query, query_params)
             items = [dict(row) for row in cur.fetchall()]
 
+            if want_facets:
+                facets = get_facets(cur, params, conditions, query_params)
+
             cur.close()
             conn.close()
 
         except Exception as e:
             print("Error in advanced search:", e)
             return render_template("advanced_search.html", error=str(e), items=[], search_performed=search_performed)
+        finally:
+            advanced_search_limiter.release()
+
+    if facets:
+        # Drill-down links keep the current filters and add the exact facet value.
+        for column, values in facets['facets'].items():
+            for value in values:
+                if value['value']:
+                    args = {**request.args.to_dict(), 'facet_' + column: value['value'], 'facets': '1'}
+                    value['url'] = url_for('advanced_search', **args)
 
-    return render_template("advanced_search.html", items=items, search_performed=search_performed)
+    active_facets = []
+    for column, param in zip(ADVANCED_SEARCH_FACETS, ADVANCED_SEARCH_FACET_PARAMS):
+        if params[param]:
+            args = {k: v for k, v in request.args.to_dict().items() if k != param}
+            active_facets.append({'param': param, 'column': column, 'value': params[param],
+                                  'remove_url': url_for('advanced_search', **args)})
+
+    return render_template("advanced_search.html", items=items, search_performed=search_performed,
+                           facets=facets, active_facets=active_facets)
 
 
 @app.route("/api/items/import-csv", methods=["POST"])
+@admission_limited(import_limiter)
 def import_csv():
     try:
         # Accept either file upload or text field
@@ -393,7 +821,7 @@ def import_csv():
         # Get current user from session
         updated_by = session.get('username', 'anonymous')
 
-        conn = get_db_conn()
+        conn = get_db_conn('import')
         cur = conn.cursor()
         imported = 0
 
@@ -433,35 +861,7 @@ def import_csv():
 
                 # Upsert by serial_no
                 if serial_no:
-                    upsert_q = sql.SQL("""
-                        INSERT INTO soc_inventory (
-                            record_date, label, type, brand, vendor, model_no, serial_no,
-                            location, location_2, location_3, invoice_no, purchase_date, price,
-                            maintenance_end_date, specification1, specification2, specification3,
-                            project_code, department, status, updated_by
-                        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                        ON CONFLICT (serial_no) DO UPDATE SET
-                          record_date = EXCLUDED.record_date,
-                          label = EXCLUDED.label,
-                          type = EXCLUDED.type,
-                          brand = EXCLUDED.brand,
-                          vendor = EXCLUDED.vendor,
-                          model_no = EXCLUDED.model_no,
-                          location = EXCLUDED.location,
-                          location_2 = EXCLUDED.location_2,
-                          location_3 = EXCLUDED.location_3,
-                          invoice_no = EXCLUDED.invoice_no,
-                          purchase_date = EXCLUDED.purchase_date,
-                          price = EXCLUDED.price,
-                          maintenance_end_date = EXCLUDED.maintenance_end_date,
-                          specification1 = EXCLUDED.specification1,
-                          specification2 = EXCLUDED.specification2,
-                          specification3 = EXCLUDED.specification3,
-                          project_code = EXCLUDED.project_code,
-                          department = EXCLUDED.department,
-                          status = EXCLUDED.status,
-                          updated_by = EXCLUDED.updated_by
-                    """)
+                    upsert_q = sql.SQL(UPSERT_ITEM_SQL)
 
                     cur.execute(upsert_q, (
                         record_date, label, item_type, brand, vendor, model_no, serial_no,
@@ -478,6 +878,7 @@ def import_csv():
         conn.commit()
         cur.close()
         conn.close()
+        search_cache.bump_generation()
 
         return jsonify({"message": "CSV import completed successfully", "imported": imported}), 200
     except Exception as e:
@@ -486,30 +887,22 @@ def import_csv():
 
 
 @app.route("/api/items/export-csv")
+@admission_limited(export_limiter)
 def export_csv():
     search_query = request.args.get('q', '').strip()
     try:
-        conn = get_db_conn()
+        conn = get_db_conn('export')
         cur = conn.cursor(cursor_factory=DictCursor)
 
         # Special case: "*" exports all items
         if search_query == "*":
-            cur.execute("SELECT * FROM soc_inventory ORDER BY updated_at DESC, label, type")
+            cur.execute(EXPORT_ALL_SQL)
         elif search_query:
-            search_sql = sql.SQL("""
-                SELECT *
-                FROM soc_inventory
-                WHERE label ILIKE %s OR type ILIKE %s OR brand ILIKE %s OR vendor ILIKE %s
-                  OR model_no ILIKE %s OR serial_no ILIKE %s OR location ILIKE %s
-                  OR location_2 ILIKE %s OR invoice_no ILIKE %s OR status ILIKE %s
-                  OR project_code ILIKE %s OR department ILIKE %s
-                ORDER BY updated_at DESC, label, type
-            """)
             sp = f"{search_query}%"
-            # SQL has 12 placeholders (label,type,brand,vendor,model_no,serial_no,location,location_2,invoice_no,status,project_code,department)
-            cur.execute(search_sql, [sp] * 12)
+            # QUICK_SEARCH_WHERE has 12 placeholders (label,type,brand,vendor,model_no,serial_no,location,location_2,invoice_no,status,project_code,department)
+            cur.execute(sql.SQL(EXPORT_SEARCH_SQL), [sp] * 12)
         else:
-            cur.execute("SELECT * FROM soc_inventory ORDER BY updated_at DESC, label, type, brand")
+            cur.execute(EXPORT_DEFAULT_SQL)
 
         items = [dict(row) for row in cur.fetchall()]
         cur.close()
@@ -531,6 +924,37 @@ def export_csv():
         return jsonify({"error": "Failed to export CSV", "details": str(e)}), 500
 
 
+def run_search(search_query, order_clause, per_page, offset):
+    """Run the count and page queries for a quick search; return (items, total_count)."""
+    conn = get_db_conn('search')
+    cur = conn.cursor(cursor_factory=DictCursor)
+
+    # Special case: "*" displays all items
+    if search_query == "*":
+        # Get total count
+        cur.execute("SELECT COUNT(*) FROM soc_inventory")
+        total_count = cur.fetchone()[0]
+
+        # Get paginated results
+        search_sql = sql.SQL(SEARCH_ALL_PAGE_SQL).format(sql.SQL(order_clause))
+        cur.execute(search_sql, (per_page, offset))
+    else:
+        # Get total count for search
+        count_sql = sql.SQL(SEARCH_COUNT_SQL)
+        sp = f"{search_query}%"
+        cur.execute(count_sql, [sp] * 12)
+        total_count = cur.fetchone()[0]
+
+        # Get paginated results
+        search_sql = sql.SQL(SEARCH_PAGE_SQL).format(sql.SQL(order_clause))
+        cur.execute(search_sql, [sp] * 12 + [per_page, offset])
+
+    items = [dict(row) for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return items, total_count
+
+
 @app.route("/search")
 def search():
     search_query = request.args.get('q', '').strip()
@@ -560,50 +984,15 @@ def search():
     
     if search_query:
         try:
-            conn = get_db_conn()
-            cur = conn.cursor(cursor_factory=DictCursor)
-            
-            # Special case: "*" displays all items
-            if search_query == "*":
-                # Get total count
-                cur.execute("SELECT COUNT(*) FROM soc_inventory")
-                total_count = cur.fetchone()[0]
-                
-                # Get paginated results
-                search_sql = sql.SQL("""
-                    SELECT * FROM soc_inventory
-                    ORDER BY {} NULLS LAST
-                    LIMIT %s OFFSET %s
-                """).format(sql.SQL(order_clause))
-                cur.execute(search_sql, (per_page, offset))
+            # ILIKE ignores case, so "Dell" and "dell" share a cache entry.
+            cache_key = search_cache.make_key('search', search_query.lower(), sort_by, sort_order.lower(), page)
+            cached = search_cache.get(cache_key)
+            if cached is not None:
+                items, total_count = cached
             else:
-                # Get total count for search
-                count_sql = sql.SQL("""
-                    SELECT COUNT(*) FROM soc_inventory
-                    WHERE label ILIKE %s OR type ILIKE %s OR brand ILIKE %s OR vendor ILIKE %s
-                      OR model_no ILIKE %s OR serial_no ILIKE %s OR location ILIKE %s
-                      OR location_2 ILIKE %s OR invoice_no ILIKE %s OR status ILIKE %s
-                      OR project_code ILIKE %s OR department ILIKE %s
-                """)
-                sp = f"{search_query}%"
-                cur.execute(count_sql, [sp] * 12)
-                total_count = cur.fetchone()[0]
-                
-                # Get paginated results
-                search_sql = sql.SQL("""
-                    SELECT * FROM soc_inventory
-                    WHERE label ILIKE %s OR type ILIKE %s OR brand ILIKE %s OR vendor ILIKE %s
-                      OR model_no ILIKE %s OR serial_no ILIKE %s OR location ILIKE %s
-                      OR location_2 ILIKE %s OR invoice_no ILIKE %s OR status ILIKE %s
-                      OR project_code ILIKE %s OR department ILIKE %s
-                    ORDER BY {} NULLS LAST
-                    LIMIT %s OFFSET %s
-                """).format(sql.SQL(order_clause))
-                cur.execute(search_sql, [sp] * 12 + [per_page, offset])
-            
-            items = [dict(row) for row in cur.fetchall()]
-            cur.close()
-            conn.close()
+                generation = search_cache.generation()
+                items, total_count = run_search(search_query, order_clause, per_page, offset)
+                search_cache.set(cache_key, (items, total_count), generation)
         except Exception as e:
             print("Error searching inventory:", e)
             return render_template("search.html", error=str(e), items=[], search_performed=search_performed, 
@@ -615,6 +1004,23 @@ def search():
                          sort_by=sort_by, sort_order=sort_order)
 
 
+@app.route("/api/search-cache/stats")
+def search_cache_stats():
+    """Hit, miss and eviction counters for the search result cache."""
+    return jsonify(search_cache.stats()), 200
+
+
+@app.route("/api/admission/stats")
+def admission_stats():
+    """Active, queued and rejected request counts per admission limiter.
+
+    These are the Flask limiters. Under asgi.py, export and import are served
+    by async routes with their own limiters, and asgi.py answers this URL
+    itself with those counts instead.
+    """
+    return jsonify({limiter.name: limiter.stats() for limiter in ADMISSION_LIMITERS}), 200
+
+
 @app.route("/api/items/<serial_no_original>", methods=["PUT"])
 def update_item(serial_no_original):
     """Update an inventory item identified by its original serial number.
@@ -657,34 +1063,9 @@ def update_item(serial_no_original):
         # Get current user from session
         updated_by = session.get('username', 'anonymous')
 
-        conn = get_db_conn()
+        conn = get_db_conn('write')
         cur = conn.cursor()
-        update_q = sql.SQL("""
-            UPDATE soc_inventory SET
-                record_date = %s,
-                label = %s,
-                type = %s,
-                brand = %s,
-                vendor = %s,
-                model_no = %s,
-                serial_no = %s,
-                location = %s,
-                location_2 = %s,
-                location_3 = %s,
-                invoice_no = %s,
-                purchase_date = %s,
-                price = %s,
-                maintenance_end_date = %s,
-                specification1 = %s,
-                specification2 = %s,
-                specification3 = %s,
-                project_code = %s,
-                department = %s,
-                status = %s,
-                updated_by = %s
-            WHERE serial_no = %s
-            RETURNING serial_no
-        """)
+        update_q = sql.SQL(UPDATE_ITEM_SQL)
         cur.execute(update_q, (
             record_date, label, item_type, brand, vendor, model_no, serial_no_new,
             location, location_2, location_3, invoice_no, purchase_date, price_val,
@@ -700,6 +1081,7 @@ def update_item(serial_no_original):
         conn.commit()
         cur.close()
         conn.close()
+        search_cache.bump_generation()
         return jsonify({"message": "Item saved successfully", "serial_no": serial_no_new}), 200
     except Exception as e:
         print("Error updating soc_inventory row:", e)
@@ -710,31 +1092,354 @@ def update_item(serial_no_original):
 def delete_item(serial_no):
     """Delete an item by serial number"""
     try:
-        conn = get_db_conn()
+        conn = get_db_conn('write')
         cur = conn.cursor()
-        
-        # Check if item exists first
-        cur.execute("SELECT serial_no FROM soc_inventory WHERE serial_no = %s", (serial_no,))
+
+        # RETURNING tells us whether the item existed, in a single round trip
+        delete_q = sql.SQL("DELETE FROM soc_inventory WHERE serial_no = %s RETURNING serial_no")
+        cur.execute(delete_q, (serial_no,))
         item = cur.fetchone()
-        
         if not item:
+            conn.rollback()
             cur.close()
             conn.close()
             return jsonify({"error": "Item not found"}), 404
-        
-        # Delete the item
-        delete_q = sql.SQL("DELETE FROM soc_inventory WHERE serial_no = %s")
-        cur.execute(delete_q, (serial_no,))
+
         conn.commit()
         cur.close()
         conn.close()
-        
+        search_cache.bump_generation()
+
         return jsonify({"message": "Item deleted successfully", "serial_no": serial_no}), 200
     except Exception as e:
         print("Error deleting soc_inventory row:", e)
         return jsonify({"error": "internal_server_error", "details": str(e)}), 500
 
 
+# --- Bulk operations ----------------------------------------------------------
+# Bulk endpoints select rows with the same filters as advanced search and work
+# through them in short transactions of at most BULK_BATCH_SIZE_MAX rows, so no
+# single statement holds row locks on thousands of items.
+BULK_BATCH_SIZE = 500
+BULK_BATCH_SIZE_MAX = 5000
+# A batch gives up instead of queueing behind a long-held lock.
+BULK_LOCK_TIMEOUT = os.getenv('BULK_LOCK_TIMEOUT', '5s')
+
+
+# Each batch is located by ctid, so the DELETE is a TID scan over the rows the
+# subquery just found. The filter goes in through sql.SQL(...).format().
+BULK_DELETE_BATCH_SQL = """
+    DELETE FROM soc_inventory
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM soc_inventory WHERE {} LIMIT %s
+    ))
+"""
+
+# Columns a bulk update may patch. serial_no is unique, so it is excluded.
+BULK_UPDATE_FIELDS = [
+    'record_date', 'label', 'type', 'brand', 'vendor', 'model_no', 'location', 'location_2',
+    'location_3', 'invoice_no', 'purchase_date', 'price', 'maintenance_end_date',
+    'specification1', 'specification2', 'specification3', 'project_code', 'department', 'status',
+]
+BULK_UPDATE_DATE_FIELDS = {'record_date', 'purchase_date', 'maintenance_end_date'}
+
+
+def bulk_filter_where(filters):
+    """Turn an advanced-search style filter dict into (where_sql, params).
+
+    Raises ValueError for unknown filter names, bad dates or prices or an
+    empty filter, since a typo must never widen a bulk change to the whole
+    table, and a bad value must be a 400 before the response starts streaming.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("'filters' must be an object")
+    unknown = set(filters) - set(ADVANCED_SEARCH_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown filters: {', '.join(sorted(unknown))}")
+    # facet_<column> values are exact matches, kept unstripped as in advanced_search.
+    params = {k: str(v) if k in ADVANCED_SEARCH_FACET_PARAMS else str(v).strip()
+              for k, v in filters.items() if v not in (None, '')}
+    for start, end, column in ADVANCED_SEARCH_RANGE_FILTERS:
+        if column == 'price':
+            continue
+        for name in (start, end):
+            if params.get(name):
+                parsed = parse_date(params[name])
+                if parsed is None:
+                    raise ValueError(f"'{name}' must be a date (YYYY-MM-DD, DD/MM/YYYY or DD-MM-YYYY)")
+                params[name] = parsed.isoformat()
+    try:
+        conditions, query_params = advanced_search_conditions(params)
+    except InvalidOperation:
+        raise ValueError("'price_min' and 'price_max' must be numbers")
+    if not conditions:
+        raise ValueError("at least one filter is required")
+    return " AND ".join(conditions), query_params
+
+
+def parse_batch_size(value):
+    if value in (None, ''):
+        return BULK_BATCH_SIZE
+    try:
+        batch_size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'batch_size' must be an integer")
+    if not 1 <= batch_size <= BULK_BATCH_SIZE_MAX:
+        raise ValueError(f"'batch_size' must be between 1 and {BULK_BATCH_SIZE_MAX}")
+    return batch_size
+
+
+def count_matching(where, query_params):
+    conn = get_db_conn('bulk')
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM soc_inventory WHERE " + where, query_params)
+    matched = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return matched
+
+
+def parse_bulk_patch(patch):
+    """Validate a bulk update patch; return {column: value} for the given fields only.
+
+    Empty strings and null clear a column. Raises ValueError on bad input.
+    """
+    if not isinstance(patch, dict) or not patch:
+        raise ValueError("'patch' must be a non-empty object")
+    if 'serial_no' in patch:
+        raise ValueError("'serial_no' is unique and cannot be bulk updated")
+    unknown = set(patch) - set(BULK_UPDATE_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields in patch: {', '.join(sorted(unknown))}")
+
+    values = {}
+    for field in BULK_UPDATE_FIELDS:
+        if field not in patch:
+            continue
+        value = patch[field]
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            values[field] = None
+        elif field in BULK_UPDATE_DATE_FIELDS:
+            values[field] = parse_date(value)
+            if values[field] is None:
+                raise ValueError(f"'{field}' must be a date")
+        elif field == 'price':
+            try:
+                values[field] = Decimal(str(value))
+            except (InvalidOperation, ValueError):
+                raise ValueError("'price' must be a number")
+            # price is NUMERIC(12,2); extra decimals would be rounded on write.
+            if not values[field].is_finite() or values[field].as_tuple().exponent < -2:
+                raise ValueError("'price' must be a number with at most 2 decimal places")
+        else:
+            values[field] = str(value)
+    return values
+
+
+def bulk_column_types(cur, fields):
+    """Map each patched column to its SQL type, e.g. {'price': 'numeric(12,2)'}."""
+    cur.execute("""
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = 'soc_inventory'::regclass AND attname = ANY(%s) AND NOT attisdropped
+    """, (list(fields),))
+    return dict(cur.fetchall())
+
+
+# format_type() output for length-limited text columns, e.g. 'character varying(100)'.
+BULK_TEXT_TYPE_RE = re.compile(r'^(?:character varying|character)\((\d+)\)$')
+
+
+def check_patch_lengths(patch, column_types):
+    """Raise ValueError for patch strings longer than their column allows.
+
+    bulk_update_changed() casts the patch value, which truncates it, but the
+    SET fails with "value too long", and only once the NDJSON stream has
+    started. Checking here turns that into a 400.
+    """
+    for field, value in patch.items():
+        match = BULK_TEXT_TYPE_RE.match(column_types.get(field, ''))
+        if isinstance(value, str) and match and len(value) > int(match.group(1)):
+            raise ValueError(f"'{field}' must be at most {match.group(1)} characters")
+
+
+def bulk_update_changed(fields, column_types):
+    """SQL that is true for rows where any patched column differs from the patch.
+
+    The patch value is cast to the column type first, so it is compared with
+    what the UPDATE would actually store (a varchar(n) or numeric(p,s) value
+    after coercion). Otherwise a row could keep matching after being updated.
+    """
+    return sql.SQL(" OR ").join(
+        sql.SQL("{} IS DISTINCT FROM CAST(%s AS {})").format(
+            sql.Identifier(f), sql.SQL(column_types[f])
+        )
+        for f in fields
+    )
+
+
+def bulk_update_statement(where, fields, column_types):
+    """Batched UPDATE of only the patched columns.
+
+    Parameters: patch values, updated_by, filter params, patch values again,
+    batch size. Rows that already hold the patched values are skipped, which
+    avoids rewriting them and lets the batches run out once every match is done.
+    column_types comes from bulk_column_types().
+    """
+    return sql.SQL("""
+        UPDATE soc_inventory SET {assignments}, updated_by = %s
+        WHERE ctid = ANY(ARRAY(
+            SELECT ctid FROM soc_inventory
+            WHERE ({where}) AND ({changed})
+            LIMIT %s
+        ))
+    """).format(
+        assignments=sql.SQL(", ").join(
+            sql.SQL("{} = %s").format(sql.Identifier(f)) for f in fields
+        ),
+        where=sql.SQL(where),
+        changed=bulk_update_changed(fields, column_types),
+    )
+
+
+def ndjson(obj):
+    return json.dumps(obj) + "\n"
+
+
+def run_batches(action, statement, query_params, batch_size, username, max_rows=None):
+    """Run a batched bulk statement until it stops affecting rows.
+
+    statement takes query_params followed by the batch size and must only
+    touch rows it has not handled yet (deleted rows are gone, updated rows no
+    longer match). Each batch is committed on its own; yields NDJSON progress
+    lines and a final summary line. The run ends with the first batch that
+    affects no rows, or once max_rows rows were affected, as a guard against a
+    statement that keeps matching.
+    """
+    total = 0
+    batches = 0
+    conn = None
+    key = action + 'd'  # 'deleted' / 'updated'
+    try:
+        conn = get_db_conn('bulk')
+        cur = conn.cursor()
+        while max_rows is None or total < max_rows:
+            limit = batch_size if max_rows is None else min(batch_size, max_rows - total)
+            cur.execute("SET LOCAL lock_timeout = %s", (BULK_LOCK_TIMEOUT,))
+            cur.execute(statement, query_params + [limit])
+            affected = cur.rowcount
+            conn.commit()
+            # A short batch does not mean we are done: rows changed concurrently
+            # drop out of the ctid recheck, so only an empty batch ends the run.
+            if affected == 0:
+                break
+            search_cache.bump_generation()
+            total += affected
+            batches += 1
+            yield ndjson({"batch": batches, key: affected, "total_" + key: total})
+        cur.close()
+        print(f"Bulk {action} by {username}: {total} items in {batches} batches")
+        yield ndjson({"done": True, key: total, "batches": batches})
+    except Exception as e:
+        print(f"Error in bulk {action}:", e)
+        if conn is not None:
+            conn.rollback()
+        # Batches already committed are kept; report how far we got.
+        yield ndjson({"error": "internal_server_error", "details": str(e), key: total, "batches": batches})
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+@app.route("/api/items/bulk-delete", methods=["POST"])
+@admission_limited(bulk_limiter)
+def bulk_delete():
+    """Delete every item matching advanced-search filters, in batches.
+
+    Body: {"filters": {...}, "dry_run": false, "batch_size": 500}. A dry run
+    returns the number of matching items. Otherwise the response streams one
+    JSON line per committed batch and a final summary line.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Expected JSON body"}), 400
+    try:
+        where, query_params = bulk_filter_where(data.get('filters'))
+        batch_size = parse_batch_size(data.get('batch_size'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if data.get('dry_run'):
+        try:
+            return jsonify({"dry_run": True, "matched": count_matching(where, query_params)}), 200
+        except Exception as e:
+            print("Error counting items for bulk delete:", e)
+            return jsonify({"error": "internal_server_error", "details": str(e)}), 500
+
+    delete_q = sql.SQL(BULK_DELETE_BATCH_SQL).format(sql.SQL(where))
+    username = session.get('username', 'anonymous')
+    return Response(stream_with_context(run_batches('delete', delete_q, query_params, batch_size, username)),
+                    mimetype="application/x-ndjson")
+
+
+@app.route("/api/items/bulk-update", methods=["POST"])
+@admission_limited(bulk_limiter)
+def bulk_update():
+    """Set a few fields on every item matching advanced-search filters.
+
+    Body: {"filters": {...}, "patch": {"location": "DC2"}, "dry_run": false,
+    "batch_size": 500}. Only the columns in the patch (and updated_by) are
+    written. A dry run returns how many items match and how many would
+    change; otherwise progress is streamed like bulk-delete.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "Expected JSON body"}), 400
+    try:
+        where, filter_params = bulk_filter_where(data.get('filters'))
+        patch = parse_bulk_patch(data.get('patch'))
+        batch_size = parse_batch_size(data.get('batch_size'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    fields = list(patch)
+    patch_values = [patch[f] for f in fields]
+
+    conn = None
+    try:
+        conn = get_db_conn('bulk')
+        cur = conn.cursor()
+        column_types = bulk_column_types(cur, fields)
+        check_patch_lengths(patch, column_types)
+        count_q = sql.SQL(
+            "SELECT COUNT(*), COUNT(*) FILTER (WHERE {}) FROM soc_inventory WHERE {}"
+        ).format(bulk_update_changed(fields, column_types), sql.SQL(where))
+        cur.execute(count_q, patch_values + filter_params)
+        matched, to_update = cur.fetchone()
+        cur.close()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("Error counting items for bulk update:", e)
+        return jsonify({"error": "internal_server_error", "details": str(e)}), 500
+    finally:
+        if conn is not None:
+            conn.close()
+
+    if data.get('dry_run'):
+        return jsonify({"dry_run": True, "matched": matched, "to_update": to_update}), 200
+
+    # Rows that only start matching during the run are left for the next call.
+    username = session.get('username', 'anonymous')
+    update_q = bulk_update_statement(where, fields, column_types)
+    query_params = patch_values + [username] + filter_params + patch_values
+    return Response(stream_with_context(run_batches('update', update_q, query_params, batch_size, username,
+                                                    max_rows=to_update)),
+                    mimetype="application/x-ndjson")
+
+
 
 @app.route("/api/items", methods=["POST"])
 def create_item():
@@ -774,39 +1479,11 @@ def create_item():
         # Get current user from session
         updated_by = session.get('username', 'anonymous')
 
-        conn = get_db_conn()
+        conn = get_db_conn('write')
         cur = conn.cursor()
 
         if serial_no:
-            q = sql.SQL("""
-                INSERT INTO soc_inventory (
-                    record_date, label, type, brand, vendor, model_no, serial_no,
-                    location, location_2, location_3, invoice_no, purchase_date, price,
-                    maintenance_end_date, specification1, specification2, specification3,
-                    project_code, department, status, updated_by
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (serial_no) DO UPDATE SET
-                    record_date = EXCLUDED.record_date,
-                    label = EXCLUDED.label,
-                    type = EXCLUDED.type,
-                    brand = EXCLUDED.brand,
-                    vendor = EXCLUDED.vendor,
-                    model_no = EXCLUDED.model_no,
-                    location = EXCLUDED.location,
-                    location_2 = EXCLUDED.location_2,
-                    location_3 = EXCLUDED.location_3,
-                    invoice_no = EXCLUDED.invoice_no,
-                    purchase_date = EXCLUDED.purchase_date,
-                    price = EXCLUDED.price,
-                    maintenance_end_date = EXCLUDED.maintenance_end_date,
-                    specification1 = EXCLUDED.specification1,
-                    specification2 = EXCLUDED.specification2,
-                    specification3 = EXCLUDED.specification3,
-                    project_code = EXCLUDED.project_code,
-                    department = EXCLUDED.department,
-                    status = EXCLUDED.status,
-                    updated_by = EXCLUDED.updated_by
-            """)
+            q = sql.SQL(UPSERT_ITEM_SQL)
             cur.execute(q, (
                 record_date, label, item_type, brand, vendor, model_no, serial_no,
                 location, location_2, location_3, invoice_no, purchase_date, price_val,
@@ -814,14 +1491,7 @@ def create_item():
                 project_code, department, status, updated_by
             ))
         else:
-            q = sql.SQL("""
-                INSERT INTO soc_inventory (
-                    record_date, label, type, brand, vendor, model_no, location,
-                    location_2, location_3, invoice_no, purchase_date, price,
-                    maintenance_end_date, specification1, specification2, specification3,
-                    project_code, department, status, updated_by
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """)
+            q = sql.SQL(INSERT_ITEM_NO_SERIAL_SQL)
             cur.execute(q, (
                 record_date, label, item_type, brand, vendor, model_no, location,
                 location_2, location_3, invoice_no, purchase_date, price_val,
@@ -832,6 +1502,7 @@ def create_item():
         conn.commit()
         cur.close()
         conn.close()
+        search_cache.bump_generation()
         return jsonify({"message": "Item saved successfully", "serial_no": serial_no}), 200
     except Exception as e:
         print("Error inserting soc_inventory row:", e)
@@ -0,0 +1,430 @@
+"""Optional ASGI serving mode.
+
+The JSON endpoints under /api/items are served by async handlers on a
+psycopg 3 async connection pool, so a slow export or import only holds a
+pooled connection instead of a whole worker. Every other route (the Jinja
+pages, login, ...) is forwarded to the regular Flask app, which keeps working
+unchanged.
+
+Run with:
+
+    pip install -r requirements-asgi.txt
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+import os
+import csv
+from contextlib import asynccontextmanager
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from io import StringIO
+
+from a2wsgi import WSGIMiddleware
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from admission import AsyncAdmissionLimiter
+from app import (
+    app as flask_app,
+    ADMISSION_LIMITERS,
+    get_db_params,
+    parse_date,
+    search_cache,
+    statement_timeout_ms,
+    EXPORT_ALL_SQL,
+    EXPORT_DEFAULT_SQL,
+    EXPORT_SEARCH_SQL,
+    INSERT_ITEM_NO_SERIAL_SQL,
+    UPDATE_ITEM_SQL,
+    UPSERT_ITEM_SQL,
+)
+
+pool = AsyncConnectionPool(
+    conninfo="",
+    kwargs=get_db_params(),
+    min_size=int(os.getenv("DB_POOL_MIN", "2")),
+    max_size=int(os.getenv("DB_POOL_MAX", "10")),
+    open=False,
+)
+
+# Rows fetched per round trip while streaming an export.
+EXPORT_FETCH_SIZE = 1000
+
+# Same limits as the Flask routes, but awaited instead of blocking a thread.
+export_limiter = AsyncAdmissionLimiter.from_env('export', max_concurrent=2)
+import_limiter = AsyncAdmissionLimiter.from_env('import', max_concurrent=2)
+
+
+def too_many_requests(limiter):
+    return JSONResponse(
+        {"error": "too_many_requests",
+         "details": f"too many concurrent {limiter.name} requests, retry later"},
+        status_code=429,
+        headers={"Retry-After": str(limiter.retry_after)},
+    )
+
+
+async def apply_statement_timeout(conn, route):
+    """Set the route's statement_timeout budget for the current transaction."""
+    timeout_ms = statement_timeout_ms(route)
+    if timeout_ms:
+        await conn.execute("SELECT set_config('statement_timeout', %s, true)", (str(timeout_ms),))
+
+
+class LimitedStreamingResponse(StreamingResponse):
+    """Streaming response that frees its admission slot when sending ends.
+
+    on_close, if given, is awaited first, also when the client goes away.
+    """
+
+    def __init__(self, content, limiter, on_close=None, **kwargs):
+        super().__init__(content, **kwargs)
+        self.limiter = limiter
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                if self.on_close is not None:
+                    await self.on_close()
+            finally:
+                await self.limiter.release()
+
+
+def load_session(request):
+    """Return the Flask session stored in the request cookie, or {}.
+
+    The cookie is signed by Flask, so we verify it with the same serializer
+    instead of trusting its contents.
+    """
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if serializer is None:
+        return {}
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+    try:
+        return serializer.loads(cookie, max_age=max_age)
+    except Exception:
+        return {}
+
+
+def session_username(request):
+    """Return the username to record as updated_by, or None when not logged in.
+
+    Mirrors the Flask app: require_login_for_pages answers /api/ requests
+    without a user_id in the session with a 401 before any view runs, and
+    the views then use session.get('username', 'anonymous').
+    """
+    session = load_session(request)
+    if not session.get('user_id'):
+        return None
+    return session.get('username', 'anonymous')
+
+
+def auth_required():
+    # Same response as require_login_for_pages in app.py.
+    return JSONResponse({'error': 'authentication_required'}, status_code=401)
+
+
+def parse_price(price):
+    """Return a Decimal (or None for empty input); raise ValueError when invalid."""
+    if price in (None, ""):
+        return None
+    try:
+        return Decimal(str(price))
+    except (InvalidOperation, ValueError):
+        raise ValueError("'price' must be a number")
+
+
+async def create_item(request):
+    username = session_username(request)
+    if username is None:
+        return auth_required()
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    if not data:
+        return JSONResponse({"error": "Expected JSON body"}, status_code=400)
+
+    try:
+        try:
+            price_val = parse_price(data.get("price"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        serial_no = data.get("serial_no")
+        head = (
+            parse_date(data.get("record_date")), data.get("label"), data.get("type"),
+            data.get("brand"), data.get("vendor"), data.get("model_no"),
+        )
+        tail = (
+            data.get("location"), data.get("location_2"), data.get("location_3"),
+            data.get("invoice_no"), parse_date(data.get("purchase_date")), price_val,
+            parse_date(data.get("maintenance_end_date")), data.get("specification1"),
+            data.get("specification2"), data.get("specification3"), data.get("project_code"),
+            data.get("department"), data.get("status"), username,
+        )
+        async with pool.connection() as conn:
+            await apply_statement_timeout(conn, 'write')
+            if serial_no:
+                await conn.execute(UPSERT_ITEM_SQL, head + (serial_no,) + tail)
+            else:
+                await conn.execute(INSERT_ITEM_NO_SERIAL_SQL, head + tail)
+        search_cache.bump_generation()
+        return JSONResponse({"message": "Item saved successfully", "serial_no": serial_no})
+    except Exception as e:
+        print("Error inserting soc_inventory row:", e)
+        return JSONResponse({"error": "internal_server_error", "details": str(e)}, status_code=500)
+
+
+async def update_item(request):
+    username = session_username(request)
+    if username is None:
+        return auth_required()
+    serial_no_original = request.path_params['serial_no']
+    try:
+        data = await request.json()
+    except Exception:
+        data = None
+    if not data:
+        return JSONResponse({"error": "Expected JSON body"}, status_code=400)
+
+    try:
+        try:
+            price_val = parse_price(data.get("price"))
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+
+        serial_no_new = data.get("serial_no") or serial_no_original
+        async with pool.connection() as conn:
+            await apply_statement_timeout(conn, 'write')
+            cur = await conn.execute(UPDATE_ITEM_SQL, (
+                parse_date(data.get("record_date")), data.get("label"), data.get("type"),
+                data.get("brand"), data.get("vendor"), data.get("model_no"), serial_no_new,
+                data.get("location"), data.get("location_2"), data.get("location_3"),
+                data.get("invoice_no"), parse_date(data.get("purchase_date")), price_val,
+                parse_date(data.get("maintenance_end_date")), data.get("specification1"),
+                data.get("specification2"), data.get("specification3"), data.get("project_code"),
+                data.get("department"), data.get("status"), username, serial_no_original,
+            ))
+            if await cur.fetchone() is None:
+                await conn.rollback()
+                return JSONResponse({"error": "Item not found"}, status_code=404)
+        search_cache.bump_generation()
+        return JSONResponse({"message": "Item saved successfully", "serial_no": serial_no_new})
+    except Exception as e:
+        print("Error updating soc_inventory row:", e)
+        return JSONResponse({"error": "internal_server_error", "details": str(e)}, status_code=500)
+
+
+async def delete_item(request):
+    if session_username(request) is None:
+        return auth_required()
+    serial_no = request.path_params['serial_no']
+    try:
+        async with pool.connection() as conn:
+            await apply_statement_timeout(conn, 'write')
+            # One round trip: RETURNING tells us whether the row existed.
+            cur = await conn.execute(
+                "DELETE FROM soc_inventory WHERE serial_no = %s RETURNING serial_no", (serial_no,)
+            )
+            if await cur.fetchone() is None:
+                return JSONResponse({"error": "Item not found"}, status_code=404)
+        search_cache.bump_generation()
+        return JSONResponse({"message": "Item deleted successfully", "serial_no": serial_no})
+    except Exception as e:
+        print("Error deleting soc_inventory row:", e)
+        return JSONResponse({"error": "internal_server_error", "details": str(e)}, status_code=500)
+
+
+async def import_csv(request):
+    username = session_username(request)
+    if username is None:
+        return auth_required()
+    if not await import_limiter.acquire():
+        return too_many_requests(import_limiter)
+    try:
+        return await run_import(request, username)
+    finally:
+        await import_limiter.release()
+
+
+async def run_import(request, username):
+    try:
+        form = await request.form()
+        csv_text = (form.get('csv_text') or '').strip()
+        file = form.get('file')
+        if isinstance(file, str) or (file is not None and not file.filename):
+            file = None
+
+        if not file and not csv_text:
+            return JSONResponse({"error": "No CSV file or text provided"}, status_code=400)
+
+        if file:
+            raw = await file.read()
+            try:
+                text = raw.decode('utf-8-sig')
+            except Exception:
+                text = raw.decode('utf-8', errors='replace')
+        else:
+            text = csv_text
+
+        reader = csv.DictReader(StringIO(text, newline=None))
+        if not reader.fieldnames:
+            return JSONResponse({"error": "CSV has no header row"}, status_code=400)
+
+        headers_set = {h.strip().lower() for h in reader.fieldnames if h}
+        expected_headers = {
+            'record_date', 'label', 'type', 'brand', 'vendor', 'model_no', 'serial_no',
+            'location', 'location_2', 'location_3', 'invoice_no', 'purchase_date', 'price',
+            'maintenance_end_date', 'specification1', 'specification2', 'specification3',
+            'project_code', 'department', 'status'
+        }
+        missing_headers = expected_headers - headers_set
+        if missing_headers:
+            return JSONResponse({
+                "error": f"CSV missing required headers: {', '.join(sorted(missing_headers))}"
+            }, status_code=400)
+
+        # Validate in Python first so the database sees one batch of good rows.
+        values = []
+        for raw_row in reader:
+            row = {(k.strip().lower() if k else ''): (v.strip() if isinstance(v, str) else v) for k, v in raw_row.items()}
+            serial_no = row.get('serial_no')
+            if not serial_no:
+                continue
+            try:
+                price_val = parse_price(row.get('price'))
+            except ValueError:
+                continue
+            values.append((
+                parse_date(row.get('record_date')), row.get('label'), row.get('type'),
+                row.get('brand'), row.get('vendor'), row.get('model_no'), serial_no,
+                row.get('location'), row.get('location_2'), row.get('location_3'),
+                row.get('invoice_no'), parse_date(row.get('purchase_date')), price_val,
+                parse_date(row.get('maintenance_end_date')), row.get('specification1'),
+                row.get('specification2'), row.get('specification3'), row.get('project_code'),
+                row.get('department'), row.get('status'), username,
+            ))
+
+        if values:
+            async with pool.connection() as conn:
+                await apply_statement_timeout(conn, 'import')
+                async with conn.cursor() as cur:
+                    await cur.executemany(UPSERT_ITEM_SQL, values)
+            search_cache.bump_generation()
+
+        return JSONResponse({"message": "CSV import completed successfully", "imported": len(values)})
+    except Exception as e:
+        print("Error importing CSV:", e)
+        return JSONResponse({"error": "Failed to import CSV", "details": str(e)}, status_code=500)
+
+
+async def export_csv(request):
+    if session_username(request) is None:
+        return auth_required()
+    search_query = request.query_params.get('q', '').strip()
+    if search_query == "*":
+        query, params = EXPORT_ALL_SQL, None
+    elif search_query:
+        query, params = EXPORT_SEARCH_SQL, [f"{search_query}%"] * 12
+    else:
+        query, params = EXPORT_DEFAULT_SQL, None
+
+    if not await export_limiter.acquire():
+        return too_many_requests(export_limiter)
+
+    # A server-side cursor streams the export instead of loading it all. The
+    # query runs and the first batch is fetched before the 200 goes out, so a
+    # query error, pool timeout or statement_timeout is still a JSON 500.
+    conn = cur = None
+    try:
+        conn = await pool.getconn()
+        await apply_statement_timeout(conn, 'export')
+        cur = conn.cursor(name='export_csv', row_factory=dict_row)
+        await cur.execute(query, params)
+        first_batch = await cur.fetchmany(EXPORT_FETCH_SIZE)
+    except Exception as e:
+        print("Error exporting CSV:", e)
+        try:
+            await close_export(conn, cur)
+        finally:
+            await export_limiter.release()
+        return JSONResponse({"error": "Failed to export CSV", "details": str(e)}, status_code=500)
+
+    async def rows():
+        batch = first_batch
+        headers = None
+        while batch:
+            output = StringIO()
+            writer = csv.DictWriter(output, fieldnames=headers or list(batch[0].keys()))
+            if headers is None:
+                headers = writer.fieldnames
+                writer.writeheader()
+            writer.writerows(batch)
+            yield output.getvalue()
+            batch = await cur.fetchmany(EXPORT_FETCH_SIZE)
+
+    filename = f"inventory_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    return LimitedStreamingResponse(
+        rows(),
+        export_limiter,
+        on_close=lambda: close_export(conn, cur),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+async def close_export(conn, cur):
+    """Close the export cursor and hand its connection back to the pool."""
+    if conn is None:
+        return
+    try:
+        if cur is not None:
+            await cur.close()
+        await conn.rollback()
+    except Exception as e:
+        print("Error closing export cursor:", e)
+    finally:
+        await pool.putconn(conn)
+
+
+async def admission_stats(request):
+    """Same report as the Flask route, but with the async export and import
+    limiters, since those are the ones guarding the routes in this mode."""
+    if session_username(request) is None:
+        return auth_required()
+    stats = {limiter.name: limiter.stats() for limiter in ADMISSION_LIMITERS}
+    for limiter in (export_limiter, import_limiter):
+        stats[limiter.name] = limiter.stats()
+    return JSONResponse(stats)
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    await pool.open()
+    try:
+        yield
+    finally:
+        await pool.close()
+
+
+routes = [
+    Route("/api/items", create_item, methods=["POST"]),
+    Route("/api/items/import-csv", import_csv, methods=["POST"]),
+    Route("/api/items/export-csv", export_csv, methods=["GET"]),
+    Route("/api/items/{serial_no}", update_item, methods=["PUT"]),
+    Route("/api/items/{serial_no}", delete_item, methods=["DELETE"]),
+    Route("/api/admission/stats", admission_stats, methods=["GET"]),
+    # Anything not matched above (pages, auth, other methods) goes to Flask.
+    Mount("/", app=WSGIMiddleware(flask_app)),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
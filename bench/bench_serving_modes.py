@@ -0,0 +1,209 @@
+"""Compare the Flask (WSGI) and ASGI serving modes under mixed traffic.
+
+Start both servers against the same database with the same number of worker
+processes, so the comparison measures the serving model and not the process
+count. Do not use `python app.py`: that is the single-process debug server.
+
+    gunicorn -w 4 --threads 8 -b 0.0.0.0:5000 app:app     # WSGI, 4 processes x 8 threads
+    uvicorn asgi:app --port 8000 --workers 4              # ASGI, 4 processes
+
+then run
+
+    python bench/bench_serving_modes.py \\
+        --target wsgi=http://localhost:5000 --target asgi=http://localhost:8000 \\
+        --user admin --password secret --concurrency 8,32,64 --duration 20 \\
+        --output bench/results/serving_modes.md
+
+Only the routes asgi.py implements are async in ASGI mode: create, update,
+delete, CSV import and export under /api/items. Every other route, including
+/search, still runs the Flask view on a2wsgi's thread pool. So in the default
+mix the search side compares the same sync code; what changes is whether it
+queues behind exports and writes. Use `--mix api` to time only the async
+routes.
+
+Each virtual user loops over a weighted mix of operations. For every target
+and concurrency level the script prints throughput and p50/p95/p99/max
+latency per operation, and appends the same table to --output as Markdown.
+Rows created by the run use a BENCH-<run id>- serial prefix and are deleted
+afterwards unless --keep is given.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+
+import httpx
+
+SEARCH_TERMS = ['*', 'dell', 'hp', 'cisco', 'srv', 'dc1', 'active', 'it']
+
+# operation -> relative weight
+DEFAULT_MIX = {'search': 60, 'create': 15, 'update': 15, 'export': 10}
+MIX_PRESETS = {
+    'default': DEFAULT_MIX,
+    # Only the routes that asgi.py serves asynchronously.
+    'api': {'search': 0, 'create': 40, 'update': 40, 'export': 20},
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def parse_mix(text):
+    if text in MIX_PRESETS:
+        return dict(MIX_PRESETS[text])
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = int(weight)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise SystemExit(f"unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+async def login(client, user, password):
+    resp = await client.post('/login', data={'username': user, 'password': password})
+    # A successful login redirects to the dashboard and sets the session cookie.
+    if resp.status_code not in (200, 302, 303) or not client.cookies:
+        raise SystemExit(f"login failed against {client.base_url}: HTTP {resp.status_code}")
+
+
+class Run:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.latencies = {name: [] for name in DEFAULT_MIX}
+        self.errors = {name: 0 for name in DEFAULT_MIX}
+        self.serials = []
+
+    async def op_search(self, client):
+        return await client.get('/search', params={'q': random.choice(SEARCH_TERMS)})
+
+    async def op_create(self, client):
+        serial = f"{self.prefix}{len(self.serials)}-{random.randrange(1 << 30)}"
+        self.serials.append(serial)
+        return await client.post('/api/items', json={
+            'serial_no': serial, 'label': 'bench', 'type': 'Server', 'brand': 'Bench',
+            'location': 'DC1', 'status': 'Active', 'price': '100.00',
+        })
+
+    async def op_update(self, client):
+        if not self.serials:
+            return await self.op_create(client)
+        serial = random.choice(self.serials)
+        return await client.put(f'/api/items/{serial}', json={
+            'serial_no': serial, 'label': 'bench-updated', 'type': 'Server', 'brand': 'Bench',
+            'location': random.choice(['DC1', 'DC2']), 'status': 'Active',
+        })
+
+    async def op_export(self, client):
+        return await client.get('/api/items/export-csv', params={'q': '*'})
+
+    async def worker(self, client, ops, weights, deadline):
+        while time.perf_counter() < deadline:
+            name = random.choices(ops, weights)[0]
+            start = time.perf_counter()
+            try:
+                resp = await getattr(self, f'op_{name}')(client)
+                ok = resp.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if ok:
+                self.latencies[name].append(elapsed)
+            else:
+                self.errors[name] += 1
+
+
+async def bench_target(label, base_url, args, concurrency):
+    run = Run(f"BENCH-{uuid.uuid4().hex[:8]}-")
+    ops = [name for name, weight in args.mix.items() if weight > 0]
+    weights = [args.mix[name] for name in ops]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await login(client, args.user, args.password)
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(run.worker(client, ops, weights, deadline) for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+        if not args.keep:
+            for serial in run.serials:
+                try:
+                    await client.delete(f'/api/items/{serial}')
+                except httpx.HTTPError:
+                    pass
+
+    total = sum(len(v) for v in run.latencies.values())
+    print(f"\n[{label}] {base_url}  concurrency={concurrency}  "
+          f"requests={total}  throughput={total / wall:.1f} req/s")
+    print(f"  {'op':<8} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = [(name, run.latencies[name], run.errors[name]) for name in ops]
+    everything = [v for values in run.latencies.values() for v in values]
+    if everything:
+        rows.append(('all', everything, sum(run.errors.values())))
+    for name, values, errors in rows:
+        print(f"  {name:<8} {len(values):>7} {errors:>5} "
+              f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+              f"{percentile(values, 99) * 1000:>9.1f} {(max(values) if values else 0) * 1000:>9.1f}")
+    if everything:
+        print(f"  mean {statistics.mean(everything) * 1000:.1f} ms")
+
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(f"\n### {label}, concurrency {concurrency}: {total / wall:.1f} req/s\n\n")
+            f.write("| op | count | errors | p50 ms | p95 ms | p99 ms | max ms |\n")
+            f.write("|----|------:|-------:|-------:|-------:|-------:|-------:|\n")
+            for name, values, errors in rows:
+                f.write(f"| {name} | {len(values)} | {errors} | {percentile(values, 50) * 1000:.1f} "
+                        f"| {percentile(values, 95) * 1000:.1f} | {percentile(values, 99) * 1000:.1f} "
+                        f"| {(max(values) if values else 0) * 1000:.1f} |\n")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', action='append', required=True,
+                        help='label=base_url, repeat for each server to compare')
+    parser.add_argument('--user', default=os.getenv('BENCH_USER'))
+    parser.add_argument('--password', default=os.getenv('BENCH_PASSWORD'))
+    parser.add_argument('--concurrency', default='8,32',
+                        help='comma separated virtual user counts (default: 8,32)')
+    parser.add_argument('--duration', type=float, default=15.0, help='seconds per run')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per request timeout')
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help="'default', 'api' (async routes only) or weights, "
+                             "e.g. search=60,create=15,update=15,export=10")
+    parser.add_argument('--output', help='append the results as Markdown tables to this file')
+    parser.add_argument('--keep', action='store_true', help='do not delete rows created by the run')
+    args = parser.parse_args()
+
+    if not args.user or not args.password:
+        parser.error('--user/--password (or BENCH_USER/BENCH_PASSWORD) are required')
+
+    targets = []
+    for spec in args.target:
+        label, sep, url = spec.partition('=')
+        if not sep:
+            parser.error(f'--target must be label=url, got {spec!r}')
+        targets.append((label, url.rstrip('/')))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(f"\n## Run {time.strftime('%Y-%m-%d %H:%M')}, {args.duration:g}s per level, "
+                    f"mix {','.join(f'{k}={v}' for k, v in args.mix.items())}\n")
+
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        for label, url in targets:
+            await bench_target(label, url, args, concurrency)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
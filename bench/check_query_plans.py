@@ -0,0 +1,362 @@
+"""Query-plan regression checks for the SQL behind every route.
+
+Loads a synthetic dataset into a scratch PostgreSQL database, applies the
+files in migrations/, then runs EXPLAIN (ANALYZE, BUFFERS) for each query
+shape used by search, advanced_search (every filter on its own and all
+together), dashboard, maintenance_expiry, export_csv, the
+insert/update/delete routes and the bulk endpoints. Write statements are
+explained inside a transaction that is rolled back.
+
+Each shape is compared with bench/plan_baselines.json and flagged when it
+
+  - does a sequential scan on a table the baseline did not scan sequentially,
+  - has a total estimated cost above baseline * (1 + --cost-tolerance),
+  - touches more shared buffers than baseline * (1 + --buffer-tolerance).
+
+Shapes without a baseline are reported as NEW, with their sequential scans
+listed, but not flagged; run with --record to accept them. The script exits
+with status 1 when anything is flagged.
+
+    # The database is wiped: point --dsn at a scratch database, never the real one.
+    python bench/check_query_plans.py --dsn "dbname=inventory_plans user=postgres" --rows 100000
+    python bench/check_query_plans.py --dsn ... --record   # accept current plans as baseline
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+import psycopg2
+from psycopg2 import sql
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import (  # noqa: E402
+    ADVANCED_SEARCH_RANGE_FILTERS,
+    ADVANCED_SEARCH_TEXT_FIELDS,
+    BULK_DELETE_BATCH_SQL,
+    DASHBOARD_RECENT_SQL,
+    DASHBOARD_TOTAL_SQL,
+    DASHBOARD_TYPE_COUNTS_SQL,
+    EXPORT_ALL_SQL,
+    EXPORT_DEFAULT_SQL,
+    EXPORT_SEARCH_SQL,
+    INSERT_ITEM_NO_SERIAL_SQL,
+    MAINTENANCE_ITEMS_SQL,
+    MAINTENANCE_SUMMARY_SQL,
+    SEARCH_ALL_PAGE_SQL,
+    SEARCH_COUNT_SQL,
+    SEARCH_PAGE_SQL,
+    UPDATE_ITEM_SQL,
+    UPSERT_ITEM_SQL,
+    advanced_search_conditions,
+    bulk_column_types,
+    bulk_filter_where,
+    bulk_update_statement,
+    facets_statement,
+)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MIGRATIONS_DIR = os.path.join(ROOT, 'migrations')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plan_baselines.json')
+
+# soc_inventory as it existed before the files in migrations/ were written.
+BASE_SCHEMA_SQL = """
+    DROP TABLE IF EXISTS soc_inventory CASCADE;
+    DROP TABLE IF EXISTS users CASCADE;
+    CREATE TABLE soc_inventory (
+        id SERIAL PRIMARY KEY,
+        record_date DATE,
+        label VARCHAR(100),
+        type VARCHAR(100),
+        brand VARCHAR(100),
+        model_no VARCHAR(100),
+        serial_no VARCHAR(100),
+        location VARCHAR(100),
+        location_2 VARCHAR(100),
+        invoice_no VARCHAR(100),
+        purchase_date DATE,
+        price NUMERIC(12, 2),
+        maintenance_end_date DATE,
+        status VARCHAR(50)
+    );
+"""
+
+# Historical order of the migrations; files not listed here are applied
+# afterwards in name order, so new migrations are picked up automatically.
+MIGRATION_ORDER = [
+    'update_soc_inventory_schema.sql',
+    'add_vendor_column.sql',
+    'add_serial_no_constraint.sql',
+    'add_timestamps.sql',
+    'add_updated_by_column.sql',
+    'create_users_table.sql',
+]
+
+SYNTHETIC_DATA_SQL = """
+    INSERT INTO soc_inventory (
+        record_date, label, type, brand, vendor, model_no, serial_no,
+        location, location_2, location_3, invoice_no, purchase_date, price,
+        maintenance_end_date, specification1, specification2, specification3,
+        project_code, department, status, updated_by
+    )
+    SELECT
+        DATE '2018-01-01' + (g %% 2900),
+        'LBL-' || g,
+        (ARRAY['Server','Switch','Router','Firewall','Storage','Laptop','Monitor','UPS'])[1 + g %% 8],
+        (ARRAY['Dell','HP','Cisco','Juniper','Lenovo','NetApp','APC','Fortinet','Arista','IBM'])[1 + g %% 10],
+        'Vendor ' || (g %% 40),
+        'MDL-' || (g %% 500),
+        'SN' || lpad(g::text, 9, '0'),
+        'DC' || (1 + g %% 6),
+        'ROW-' || (g %% 60),
+        'RACK-' || (g %% 400),
+        'INV-' || (g / 25),
+        DATE '2017-06-01' + (g %% 3000),
+        ((g %% 5000) * 3.17)::numeric(12, 2),
+        CASE WHEN g %% 7 = 0 THEN NULL ELSE CURRENT_DATE - 720 + (g %% 1800) END,
+        'CPU ' || (g %% 64), 'RAM ' || (g %% 32), 'DISK ' || (g %% 16),
+        'PRJ-' || (g %% 150),
+        (ARRAY['IT','Network','Security','Facilities','Finance','Research'])[1 + g %% 6],
+        (ARRAY['Active','Spare','Retired','Repair','Disposed'])[1 + g %% 5],
+        'bench'
+    FROM generate_series(1, %s) AS g
+"""
+
+# Sort columns worth checking for the paginated search; the rest share a plan shape.
+SEARCH_SORTS = ['updated_at DESC', 'label ASC', 'serial_no ASC', 'maintenance_end_date ASC']
+
+# A representative value for every advanced search filter. The synthetic
+# maintenance_end_date values are relative to CURRENT_DATE, so the sample
+# range is too; otherwise it would match fewer rows every day and the plans
+# would drift away from the baseline.
+MAINTENANCE_SAMPLE_START = (date.today() + timedelta(days=180)).isoformat()
+MAINTENANCE_SAMPLE_END = (date.today() + timedelta(days=270)).isoformat()
+ADVANCED_SEARCH_SAMPLES = {
+    'record_date_start': '2022-01-01', 'record_date_end': '2022-03-31',
+    'purchase_date_start': '2021-01-01', 'purchase_date_end': '2021-06-30',
+    'maintenance_date_start': MAINTENANCE_SAMPLE_START, 'maintenance_date_end': MAINTENANCE_SAMPLE_END,
+    'price_min': '1000', 'price_max': '2000',
+    'label': 'LBL-12', 'type': 'Serv', 'brand': 'Del', 'vendor': 'Vendor 1',
+    'model_no': 'MDL-4', 'serial_no': 'SN00001', 'location': 'DC3', 'location_2': 'ROW-1',
+    'location_3': 'RACK-12', 'invoice_no': 'INV-10', 'specification1': 'CPU 3',
+    'specification2': 'RAM 1', 'specification3': 'DISK 2', 'project_code': 'PRJ-9',
+    'department': 'Net', 'status': 'Act',
+}
+
+SAMPLE_ITEM = (
+    '2024-01-01', 'plan-check', 'Server', 'Dell', 'Vendor 1', 'MDL-1', 'SN000000042',
+    'DC1', 'ROW-1', 'RACK-1', 'INV-1', '2023-12-01', 100, '2026-01-01',
+    'CPU 1', 'RAM 1', 'DISK 1', 'PRJ-1', 'IT', 'Active', 'bench',
+)
+
+
+def advanced_search_sql(params):
+    conditions, query_params = advanced_search_conditions(params)
+    query = "SELECT * FROM soc_inventory"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + " ORDER BY label, type, brand", query_params
+
+
+def query_shapes(conn):
+    """Yield (name, query, params) for every route's SQL."""
+    for order in SEARCH_SORTS:
+        suffix = order.split()[0]
+        yield ('search.all_page.' + suffix,
+               sql.SQL(SEARCH_ALL_PAGE_SQL).format(sql.SQL(order)), (50, 0))
+        yield ('search.page.' + suffix,
+               sql.SQL(SEARCH_PAGE_SQL).format(sql.SQL(order)), ['Dell%'] * 12 + [50, 0])
+    yield 'search.all_count', "SELECT COUNT(*) FROM soc_inventory", None
+    yield 'search.count', SEARCH_COUNT_SQL, ['Dell%'] * 12
+    yield 'search.count.serial', SEARCH_COUNT_SQL, ['SN0000123%'] * 12
+
+    for start, end, column in ADVANCED_SEARCH_RANGE_FILTERS:
+        for param in (start, end):
+            query, params = advanced_search_sql({param: ADVANCED_SEARCH_SAMPLES[param]})
+            yield 'advanced_search.' + param, query, params
+        query, params = advanced_search_sql({start: ADVANCED_SEARCH_SAMPLES[start],
+                                             end: ADVANCED_SEARCH_SAMPLES[end]})
+        yield f'advanced_search.{column}_range', query, params
+    for field in ADVANCED_SEARCH_TEXT_FIELDS:
+        query, params = advanced_search_sql({field: ADVANCED_SEARCH_SAMPLES[field]})
+        yield 'advanced_search.' + field, query, params
+    query, params = advanced_search_sql(ADVANCED_SEARCH_SAMPLES)
+    yield 'advanced_search.all_filters', query, params
+    for name, filters in [('brand', {'brand': 'Del'}), ('location', {'location': 'DC3'})]:
+        conditions, params = advanced_search_conditions(filters)
+        yield 'advanced_search.facets.' + name, facets_statement(" AND ".join(conditions)), params
+
+    yield 'dashboard.type_counts', DASHBOARD_TYPE_COUNTS_SQL, None
+    yield 'dashboard.total', DASHBOARD_TOTAL_SQL, None
+    yield 'dashboard.recent', DASHBOARD_RECENT_SQL, None
+
+    yield 'maintenance_expiry.summary', MAINTENANCE_SUMMARY_SQL, None
+    yield 'maintenance_expiry.items_90', MAINTENANCE_ITEMS_SQL, (90, 1000)
+
+    yield 'export_csv.all', EXPORT_ALL_SQL, None
+    yield 'export_csv.search', EXPORT_SEARCH_SQL, ['Dell%'] * 12
+    yield 'export_csv.default', EXPORT_DEFAULT_SQL, None
+
+    yield 'upsert.existing_serial', UPSERT_ITEM_SQL, SAMPLE_ITEM
+    yield 'upsert.new_serial', UPSERT_ITEM_SQL, SAMPLE_ITEM[:6] + ('SN-NEW-1',) + SAMPLE_ITEM[7:]
+    yield 'insert.no_serial', INSERT_ITEM_NO_SERIAL_SQL, SAMPLE_ITEM[:6] + SAMPLE_ITEM[7:]
+    yield 'update_item', UPDATE_ITEM_SQL, SAMPLE_ITEM + ('SN000000042',)
+    yield ('delete_item',
+           "DELETE FROM soc_inventory WHERE serial_no = %s RETURNING serial_no", ('SN000000042',))
+
+    # Column types come from the loaded schema, as in the bulk-update route.
+    patch_fields = ['location', 'department']
+    cur = conn.cursor()
+    column_types = bulk_column_types(cur, patch_fields)
+    cur.close()
+    conn.rollback()
+    for name, filters in [('location', {'location': 'DC3'}),
+                          ('maintenance_range', {'maintenance_date_start': MAINTENANCE_SAMPLE_START,
+                                                 'maintenance_date_end': MAINTENANCE_SAMPLE_END})]:
+        where, params = bulk_filter_where(filters)
+        yield ('bulk_delete.count.' + name,
+               "SELECT COUNT(*) FROM soc_inventory WHERE " + where, params)
+        yield ('bulk_delete.batch.' + name,
+               sql.SQL(BULK_DELETE_BATCH_SQL).format(sql.SQL(where)), params + [500])
+        patch = ['DC9', 'Network']
+        yield ('bulk_update.batch.' + name,
+               bulk_update_statement(where, patch_fields, column_types),
+               patch + ['bench'] + params + patch + [500])
+
+
+def apply_migrations(cur):
+    names = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql'))
+    ordered = [n for n in MIGRATION_ORDER if n in names] + [n for n in names if n not in MIGRATION_ORDER]
+    for name in ordered:
+        with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as f:
+            cur.execute(f.read())
+        print(f"applied migrations/{name}")
+
+
+def load_dataset(conn, rows):
+    cur = conn.cursor()
+    cur.execute(BASE_SCHEMA_SQL)
+    apply_migrations(cur)
+    cur.execute(SYNTHETIC_DATA_SQL, (rows,))
+    conn.commit()
+    # VACUUM cannot run inside a transaction block.
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE soc_inventory")
+    conn.autocommit = False
+    cur.close()
+    print(f"loaded {rows} synthetic rows")
+
+
+def walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from walk(child)
+
+
+def explain(conn, query, params):
+    cur = conn.cursor()
+    explain_sql = sql.SQL("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ") + (
+        query if isinstance(query, sql.Composable) else sql.SQL(query)
+    )
+    try:
+        cur.execute(explain_sql, params)
+        plan = cur.fetchone()[0][0]
+    finally:
+        # Also undoes the writes performed by EXPLAIN ANALYZE.
+        conn.rollback()
+        cur.close()
+
+    root = plan['Plan']
+    seq_scans = sorted({n['Relation Name'] for n in walk(root) if n['Node Type'] == 'Seq Scan'})
+    return {
+        'total_cost': root['Total Cost'],
+        'shared_buffers': root.get('Shared Hit Blocks', 0) + root.get('Shared Read Blocks', 0),
+        'execution_ms': round(plan.get('Execution Time', 0.0), 3),
+        'seq_scans': seq_scans,
+        'nodes': sorted({n['Node Type'] for n in walk(root)}),
+    }
+
+
+def compare(result, base, args):
+    problems = []
+    new_scans = [t for t in result['seq_scans'] if t not in base['seq_scans']]
+    if new_scans:
+        problems.append(f"sequential scan on {', '.join(new_scans)}")
+    cost_limit = base['total_cost'] * (1 + args.cost_tolerance)
+    if result['total_cost'] > cost_limit:
+        problems.append(f"cost {result['total_cost']:.1f} > baseline {base['total_cost']:.1f}")
+    buffer_limit = base['shared_buffers'] * (1 + args.buffer_tolerance)
+    if result['shared_buffers'] > buffer_limit:
+        problems.append(f"buffers {result['shared_buffers']} > baseline {base['shared_buffers']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=os.getenv('PLAN_CHECK_DSN'),
+                        help='libpq connection string of a scratch database (or PLAN_CHECK_DSN)')
+    parser.add_argument('--rows', type=int, default=100000, help='synthetic rows to load')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--record', action='store_true', help='write the current plans as the new baseline')
+    parser.add_argument('--skip-load', action='store_true', help='reuse the data already in the database')
+    parser.add_argument('--only', help='only check shapes whose name starts with this prefix')
+    parser.add_argument('--cost-tolerance', type=float, default=0.10)
+    parser.add_argument('--buffer-tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error('--dsn (or PLAN_CHECK_DSN) is required; the database is wiped and reloaded')
+
+    conn = psycopg2.connect(args.dsn)
+    if not args.skip_load:
+        load_dataset(conn, args.rows)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    flagged = 0
+    missing = 0
+    for name, query, params in query_shapes(conn):
+        if args.only and not name.startswith(args.only):
+            continue
+        result = explain(conn, query, params)
+        results[name] = result
+        notes = []
+        if args.record:
+            status = 'ok'
+        elif name not in baseline:
+            status = 'NEW'
+            missing += 1
+            notes.append('no baseline, needs --record')
+            if result['seq_scans']:
+                notes.append(f"sequential scan on {', '.join(result['seq_scans'])}")
+        else:
+            notes = compare(result, baseline[name], args)
+            status = 'FLAG' if notes else 'ok'
+            flagged += bool(notes)
+        print(f"{status:<4}  {name:<40} cost={result['total_cost']:>12.1f} "
+              f"buffers={result['shared_buffers']:>7} time={result['execution_ms']:>9.3f}ms"
+              + (f"  <- {'; '.join(notes)}" if notes else ''))
+    conn.close()
+
+    if args.record:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"recorded {len(results)} plans in {args.baseline}")
+        return 0
+
+    print(f"\n{len(results)} query shapes checked, {flagged} flagged, {missing} without baseline")
+    if missing:
+        print(f"record the missing baselines with --record (writes {args.baseline})")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Result cache for repeated searches.
+
+Entries live in an in-process LRU bounded by total pickled size and expire
+after a TTL. Every write to soc_inventory bumps a write generation; entries
+stored under an older generation are treated as misses. Without a shared
+path the generation only exists in this process, so a search never returns
+results from before the last write made through this process, but writes
+handled by other worker processes are only picked up when the TTL expires.
+
+When a path is given, entries and the generation are also kept in a local
+SQLite file, so several worker processes on the same host share hits and
+invalidations. Use it whenever more than one worker serves requests. If the
+shared generation cannot be read, lookups are misses and nothing is stored;
+other failures of the shared store are logged and ignored. The cache must
+never break a search.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    def __init__(self, max_bytes, ttl, shared_path=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared_path = shared_path
+        self._entries = OrderedDict()  # key -> (generation, expires_at, size, blob)
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        if shared_path:
+            self._init_shared()
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from SEARCH_CACHE_MAX_BYTES, SEARCH_CACHE_TTL and SEARCH_CACHE_PATH.
+
+        SEARCH_CACHE_MAX_BYTES=0 or SEARCH_CACHE_TTL=0 disables caching.
+        """
+        return cls(
+            max_bytes=int(os.getenv('SEARCH_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', '60')),
+            shared_path=os.getenv('SEARCH_CACHE_PATH') or None,
+        )
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.ttl > 0
+
+    @staticmethod
+    def make_key(*parts):
+        return json.dumps(parts, default=str)
+
+    # --- shared store -------------------------------------------------------
+
+    def _shared(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.shared_path, timeout=1, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _init_shared(self):
+        try:
+            conn = self._shared()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY, generation INTEGER, expires_at REAL,
+                    size INTEGER, created_at REAL, value BLOB
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (id, generation) VALUES (1, 0)")
+        except sqlite3.Error as e:
+            print("Search cache: shared store unavailable:", e)
+            self.shared_path = None
+
+    # --- generation ---------------------------------------------------------
+
+    def generation(self):
+        """Current write generation; read it before running the query you cache.
+
+        Returns None when the shared generation cannot be read: the local
+        counter does not see other processes' writes, so it is not a safe
+        fallback.
+        """
+        if self.shared_path:
+            try:
+                row = self._shared().execute("SELECT generation FROM meta WHERE id = 1").fetchone()
+                return row[0]
+            except sqlite3.Error as e:
+                print("Search cache: reading shared generation failed:", e)
+                return None
+        return self._generation
+
+    def bump_generation(self):
+        """Invalidate every cached result. Call after each committed write."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._stats['invalidations'] += 1
+        if self.shared_path:
+            try:
+                conn = self._shared()
+                conn.execute("UPDATE meta SET generation = generation + 1 WHERE id = 1")
+                conn.execute("DELETE FROM entries WHERE generation < (SELECT generation FROM meta WHERE id = 1)")
+            except sqlite3.Error as e:
+                print("Search cache: bumping shared generation failed:", e)
+
+    # --- get / set ----------------------------------------------------------
+
+    def get(self, key):
+        """Return the cached value or None."""
+        if not self.enabled:
+            return None
+        generation = self.generation()
+        if generation is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == generation and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return pickle.loads(entry[3])
+                self._drop(key)
+
+        if self.shared_path:
+            try:
+                row = self._shared().execute(
+                    "SELECT expires_at, value FROM entries WHERE key = ? AND generation = ? AND expires_at > ?",
+                    (key, generation, now),
+                ).fetchone()
+            except sqlite3.Error as e:
+                print("Search cache: shared lookup failed:", e)
+                row = None
+            if row is not None:
+                with self._lock:
+                    self._stats['shared_hits'] += 1
+                    self._store(key, generation, row[0], row[1])
+                return pickle.loads(row[1])
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, value, generation):
+        """Cache value, unless a write happened since `generation` was read."""
+        if not self.enabled:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl
+        if generation is None or generation != self.generation():
+            return
+        with self._lock:
+            self._store(key, generation, expires_at, blob)
+
+        if self.shared_path:
+            try:
+                conn = self._shared()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, generation, expires_at, size, created_at, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, generation, expires_at, len(blob), time.time(), blob),
+                )
+                # Keep the newest entries that fit in max_bytes.
+                conn.execute("""
+                    DELETE FROM entries WHERE expires_at <= ? OR key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY created_at DESC, key) AS running
+                            FROM entries
+                        ) WHERE running > ?
+                    )
+                """, (time.time(), self.max_bytes))
+            except sqlite3.Error as e:
+                print("Search cache: shared store write failed:", e)
+
+    def _store(self, key, generation, expires_at, blob):
+        # Caller holds self._lock.
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (generation, expires_at, len(blob), blob)
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats['evictions'] += 1
+
+    def _drop(self, key):
+        # Caller holds self._lock.
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'shared_path': self.shared_path,
+            })
+        stats['generation'] = self.generation()
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+        return stats